@@ -0,0 +1,1580 @@
+# bench_agente.py - Benchmarks do Agente IA (agente_template_final.py)
+#
+# Uso:
+#   python bench_agente.py                 # roda todos
+#   python bench_agente.py config_concorrente
+#   AGENT_BENCH_URL=http://host:5000 python bench_agente.py carga   # contra um servidor já no ar
+#
+# Baselines (métricas *_us/_ms/_s/_kb/_mb: menor é melhor; *_rps/_por_s/_x: maior é melhor):
+#   python bench_agente.py caminhos_quentes --save baseline.json
+#   python bench_agente.py caminhos_quentes --compare baseline.json --tolerance 0.25
+# Com --compare, sai com código 1 se alguma métrica piorou além da tolerância.
+import argparse
+import contextlib
+import glob
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import timeit
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import datetime
+from time import perf_counter, sleep
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import agente_template_final as agente
+
+BENCHMARKS = {}
+
+def benchmark(func):
+    BENCHMARKS[func.__name__.replace('bench_', '', 1)] = func
+    return func
+
+def percentil(amostras, p):
+    if not amostras:
+        return 0.0
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+def config_exemplo(nome='Pizzaria Teste'):
+    config = json.loads(json.dumps(agente.DEFAULT_CONFIG))
+    config['restaurante']['nome'] = nome
+    return config
+
+def config_sempre_aberta():
+    config = config_exemplo()
+    for dia in ('segunda', 'terca', 'quarta', 'quinta', 'sexta', 'sabado', 'domingo'):
+        config['horario'][dia] = {'ativo': True, 'inicio': '00:00', 'fim': '23:59'}
+    return config
+
+def por_chamada_us(func, repeticoes=5, numero=2000):
+    # Melhor de N rodadas, em microssegundos por chamada
+    return min(timeit.repeat(func, repeat=repeticoes, number=numero)) / numero * 1e6
+
+MENSAGENS = [
+    'oi', 'Olá, boa noite!', 'qual o cardápio?', 'manda o cardapio', 'tem promoção hoje?',
+    'vocês fazem entrega no centro?', 'qual o endereço', 'qual o horário de hoje',
+    'aceita pagamento com pix?', 'quero uma pizza de calabresa', 'telefone pfv',
+    'quero falar com alguém 😅', 'ok obrigado 🙏',
+]
+
+def generate_test_response_original(message, config):
+    # Cópia da implementação anterior, para comparação
+    nome = config['personalidade']['nome']
+    restaurante = config['restaurante']
+    status = agente.is_restaurant_open(config)
+
+    if not status['open']:
+        return status['message']
+
+    responses = {
+        'oi': f"Oi! Sou {nome} do {restaurante['nome']}! Como posso ajudar?",
+        'olá': f"Olá! Bem-vindo ao {restaurante['nome']}! Em que posso ajudar?",
+        'cardápio': f"Nosso cardápio: {restaurante['link_cardapio']} 📋 Posso sugerir algo?",
+        'cardapio': f"Menu completo: {restaurante['link_cardapio']} 🍕 O que te interessa?",
+        'menu': f"Menu completo: {restaurante['link_cardapio']} 🍕 O que te interessa?",
+        'pizza': f"Temos pizzas deliciosas! Veja: {restaurante['link_cardapio']} Qual sabor?",
+        'promoção': f"Promoções: {' | '.join(restaurante['promocoes_ativas'])} 🎉",
+        'promocao': f"Promoções: {' | '.join(restaurante['promocoes_ativas'])} 🎉",
+        'entrega': f"Entregamos em: {restaurante['zona_entrega']}. Taxa: R$ {restaurante['taxa_entrega']:.2f}. Tempo: {restaurante['tempo_entrega']}",
+        'telefone': f"Telefone: {restaurante['telefone']} 📞",
+        'endereço': f"Endereço: {restaurante['endereco']} 📍",
+        'endereco': f"Endereço: {restaurante['endereco']} 📍",
+        'horário': f"Hoje: {config['horario'][agente.get_current_day_name()]['inicio']} às {config['horario'][agente.get_current_day_name()]['fim']} ⏰",
+        'horario': f"Hoje: {config['horario'][agente.get_current_day_name()]['inicio']} às {config['horario'][agente.get_current_day_name()]['fim']} ⏰",
+        'pagamento': f"Aceitamos: {restaurante['formas_pagamento']} 💳"
+    }
+
+    for key, value in responses.items():
+        if key in message.lower():
+            return value
+
+    return f"Veja nosso cardápio: {restaurante['link_cardapio']} 📋 Como posso ajudar?"
+
+# Mensagens reais de clientes: acentos, caixa alta, emojis, gírias e textos longos
+CORPUS_PT = MENSAGENS + [
+    'Boa noite!! 😊', 'OLÁ', 'oii tudo bem?', 'Vcs tão abertos hj?', 'qual o horário de funcionamento de domingo?',
+    'Quero ver o CARDÁPIO 🍕🍕', 'me manda o menu por favor 🙏', 'tem pizza de frango com catupiry?',
+    'Qual a promoção de terça?', 'promoçãozinha pra hoje? 👀', 'Vocês entregam na Vila Madalena?',
+    'quanto é a taxa de entrega pra Pinheiros', 'Onde fica o restaurante? Qual o endereço certinho?',
+    'aceitam cartão de crédito ou só pix?', 'forma de pagamento', 'me passa o telefone de vocês',
+    'Oi, boa tarde. Gostaria de saber se vocês fazem entrega no Centro e quanto tempo demora, obrigado!',
+    'kkkkk valeu', '👍', '🍕❤️', 'Pedido pra 2 pessoas, o que recomendam?', 'tem opção sem glúten?',
+    'CÊ TEM COCA-COLA GELADA?', 'ainda dá tempo de pedir? já é quase meia-noite', 'tchau, obrigado!',
+]
+
+def config_muitas_promocoes(quantidade=200):
+    config = config_sempre_aberta()
+    config['restaurante']['promocoes_ativas'] = [f'Promoção {i}: combo nº {i} com refri 🥤 por R$ {20 + i % 30},90'
+                                                 for i in range(quantidade)]
+    return config
+
+def config_madrugada():
+    # Turnos que passam da meia-noite, sábado até 04:00 e domingo fechado
+    config = config_exemplo('Pizzaria Madrugada')
+    for dia in ('segunda', 'terca', 'quarta', 'quinta', 'sexta'):
+        config['horario'][dia] = {'ativo': True, 'inicio': '18:00', 'fim': '02:00'}
+    config['horario']['sabado'] = {'ativo': True, 'inicio': '18:00', 'fim': '04:00'}
+    config['horario']['domingo'] = {'ativo': False, 'inicio': '18:00', 'fim': '23:00'}
+    return config
+
+def snapshot(config):
+    # Como o ConfigStore publica: congelado e com cache de derivados
+    config = agente.freeze_config(config)
+    config.version = 1
+    config.derived = {}
+    return config
+
+@contextlib.contextmanager
+def relogio_congelado(momento):
+    # Troca o relógio do agente por um parado em `momento` (sem tzinfo: hora
+    # local do restaurante)
+    original = agente.clock
+    agente.clock = agente.FixedClock(momento)
+    try:
+        yield
+    finally:
+        agente.clock = original
+
+MOMENTOS = {
+    'sexta_21h': datetime(2026, 10, 16, 21, 0),
+    'sabado_01h30_turno_de_sexta': datetime(2026, 10, 17, 1, 30),
+    'domingo_15h_fechado': datetime(2026, 10, 18, 15, 0),
+    'segunda_10h_antes_de_abrir': datetime(2026, 10, 19, 10, 0),
+}
+
+@benchmark
+def bench_caminhos_quentes():
+    # As funções e rotas do dia a dia com fixtures realistas e relógio congelado
+    resultado = {}
+    promocoes = snapshot(config_muitas_promocoes())
+    madrugada = snapshot(config_madrugada())
+    with relogio_congelado(MOMENTOS['sexta_21h']):
+        resultado['generate_test_response_aberto_us'] = por_chamada_us(
+            lambda: [agente.generate_test_response(m, promocoes) for m in CORPUS_PT], numero=200) / len(CORPUS_PT)
+    for nome, momento in MOMENTOS.items():
+        with relogio_congelado(momento):
+            resultado[f'is_restaurant_open_{nome}_us'] = por_chamada_us(lambda: agente.is_restaurant_open(madrugada))
+    with relogio_congelado(MOMENTOS['domingo_15h_fechado']):
+        resultado['generate_test_response_fechado_us'] = por_chamada_us(
+            lambda: [agente.generate_test_response(m, madrugada) for m in CORPUS_PT], numero=200) / len(CORPUS_PT)
+        resultado['get_next_opening_us'] = por_chamada_us(lambda: agente.get_next_opening(madrugada))
+
+    diretorio = tempfile.mkdtemp(prefix='bench_quentes_')
+    store_original = agente.config_store
+    try:
+        verificar_config_antiga(diretorio)
+        agente.config_store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+        agente.save_config(config_madrugada())
+        resultado['load_config_us'] = por_chamada_us(agente.load_config)
+        resultado['save_config_ms'] = por_chamada_us(lambda: agente.save_config(config_madrugada()),
+                                                     repeticoes=3, numero=20) / 1e3
+        cliente = agente.app.test_client()
+        corpo = json.dumps({'message': 'Vocês entregam na Vila Madalena? 🛵'}).encode('utf-8')
+        with relogio_congelado(MOMENTOS['sexta_21h']):
+            resultado['rota_test_agent_us'] = por_chamada_us(
+                lambda: cliente.post('/api/test-agent', data=corpo, content_type='application/json'), numero=500)
+            resultado['rota_status_us'] = por_chamada_us(lambda: cliente.get('/api/status'), numero=500)
+            resultado['rota_config_us'] = por_chamada_us(lambda: cliente.get('/config'), numero=500)
+            resultado['rota_save_config_ms'] = por_chamada_us(
+                lambda: cliente.post('/api/save-config', json=config_madrugada()), repeticoes=3, numero=20) / 1e3
+    finally:
+        agente.config_store = store_original
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return resultado
+
+def verificar_config_antiga(diretorio):
+    # Arquivo gravado antes das regras atuais (dia ativo sem horário): continua
+    # valendo o restaurante do arquivo, com o dia fechado, e não o padrão
+    config = config_exemplo('Cantina Real')
+    config['horario']['domingo'] = {'ativo': True, 'inicio': '', 'fim': ''}
+    caminho = os.path.join(diretorio, 'antiga.json')
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump(config, f)
+    carregada = agente.ConfigStore(caminho).get()
+    assert carregada['restaurante']['nome'] == 'Cantina Real', carregada['restaurante']
+    assert carregada['horario']['domingo']['ativo'] is False, carregada['horario']['domingo']
+    assert carregada['horario']['segunda'] == config['horario']['segunda']
+
+@benchmark
+def bench_intencoes():
+    # Mesmo corpus nas duas implementações; a config é um snapshot do store,
+    # então o motor de intenções é compilado uma vez e reaproveitado
+    config = snapshot(config_sempre_aberta())
+    original = por_chamada_us(lambda: [generate_test_response_original(m, config) for m in MENSAGENS]) / len(MENSAGENS)
+    novo = por_chamada_us(lambda: [agente.generate_test_response(m, config) for m in MENSAGENS]) / len(MENSAGENS)
+    return {'original_us': original, 'compilado_us': novo, 'aceleracao_x': original / novo}
+
+@benchmark
+def bench_intencoes_escala():
+    # Casamento puro com centenas de palavras-chave: varredura linear vs. Aho-Corasick
+    resultado = {}
+    mensagem = agente.fold_text('oi, vocês entregam pizza de calabresa na vila madalena hoje à noite?')
+    for quantidade in (16, 128, 512):
+        palavras = [f'produto{i:04d}' for i in range(quantidade - 1)] + ['madalena']
+        matcher = agente.KeywordMatcher((p, i, p) for i, p in enumerate(palavras))
+        linear = por_chamada_us(lambda: next((p for p in palavras if p in mensagem), None), numero=500)
+        automato = por_chamada_us(lambda: matcher.find(mensagem), numero=500)
+        resultado[f'linear_{quantidade}_us'] = linear
+        resultado[f'aho_corasick_{quantidade}_us'] = automato
+    return resultado
+
+def is_restaurant_open_original(config):
+    # Cópia da implementação anterior (reinterpreta o horário a cada chamada)
+    from datetime import datetime, time
+    now = datetime.now()
+    current_time = now.time()
+    horario = config['horario'].get(agente.get_current_day_name(), {})
+    if not horario.get('ativo', False):
+        return {'open': False, 'reason': 'closed_today'}
+    inicio = time.fromisoformat(horario['inicio'])
+    fim = time.fromisoformat(horario['fim'])
+    if fim < inicio:
+        is_open = current_time >= inicio or current_time <= fim
+    else:
+        is_open = inicio <= current_time <= fim
+    return {'open': is_open, 'reason': 'open' if is_open else 'closed'}
+
+@benchmark
+def bench_agenda():
+    config = snapshot(config_exemplo())
+    agenda = agente.weekly_schedule(config)
+    minutos = list(range(0, agente.MINUTOS_SEMANA, 7))
+    return {
+        'is_restaurant_open_original_us': por_chamada_us(lambda: is_restaurant_open_original(config)),
+        'is_restaurant_open_us': por_chamada_us(lambda: agente.is_restaurant_open(config)),
+        'status_at_semana_inteira_us': por_chamada_us(lambda: [agenda.status_at(m) for m in minutos], numero=20) / len(minutos),
+        'next_opening_after_us': por_chamada_us(lambda: agenda.next_opening_after(4000)),
+    }
+
+FUSOS = ('America/Sao_Paulo', 'America/Manaus', 'America/Cuiaba', 'America/Rio_Branco', 'America/Noronha',
+         'Europe/Lisbon', 'America/New_York')
+
+@benchmark
+def bench_fusos(tenants=5000):
+    # Agenda de milhares de restaurantes em fusos diferentes avaliada num
+    # mesmo instante (relógio fixo em UTC): status de todos em uma passada
+    snapshots = []
+    for i in range(tenants):
+        config = config_exemplo(f'Restaurante {i}')
+        config['horario']['fuso_horario'] = FUSOS[i % len(FUSOS)]
+        snapshots.append(snapshot(config))
+    instante = datetime(2026, 10, 17, 0, 30, tzinfo=agente.timezone.utc)
+    abertos = sum(agente.is_restaurant_open(c, instante)['open'] for c in snapshots)
+    assert 0 < abertos < tenants, abertos
+    return {
+        'tenants': tenants,
+        'abertos_no_instante': abertos,
+        'status_por_tenant_us': por_chamada_us(lambda: [agente.is_restaurant_open(c, instante) for c in snapshots],
+                                                repeticoes=3, numero=5) / tenants,
+        'hora_local_us': por_chamada_us(lambda: agente.local_time(snapshots[0], instante)),
+    }
+
+def config_zonas(quantidade):
+    # `quantidade` zonas numa grade de quadrados de ~1 km, cada uma com dois
+    # bairros e um prefixo de CEP
+    config = config_exemplo()
+    lado = int(quantidade ** 0.5) + 1
+    zonas = []
+    for i in range(quantidade):
+        lat, lon = -23.8 + (i // lado) * 0.01, -46.9 + (i % lado) * 0.01
+        zonas.append({
+            'nome': f'Zona {i}', 'bairros': [f'Jardim São Bento {i}', f'Vila Nova Conceição {i}'],
+            'ceps': [f'{10000 + i:05d}'], 'taxa': 3 + i % 10, 'tempo': '30-45 minutos',
+            'poligono': [[lat, lon], [lat + 0.01, lon], [lat + 0.01, lon + 0.01], [lat, lon + 0.01]],
+        })
+    config['restaurante']['zonas_entrega'] = zonas
+    return config, lado
+
+@benchmark
+def bench_zonas(quantidade=5000):
+    # "Entregam no bairro X / CEP Y / neste ponto?" com milhares de zonas:
+    # índices compilados vs. varrer a lista de zonas
+    config, lado = config_zonas(quantidade)
+    inicio = perf_counter()
+    zonas = agente.DeliveryZones(snapshot(config))
+    compilar = perf_counter() - inicio
+    pontos = [(-23.8 + random.random() * lado * 0.01, -46.9 + random.random() * lado * 0.01) for _ in range(1000)]
+    lista = zonas.zonas
+
+    def ponto_linear(lat, lon):
+        for zona in lista:
+            if agente._ponto_no_poligono(lat, lon, zona.poligono):
+                return zona
+        return None
+
+    achados = sum(zonas.by_point(lat, lon) is ponto_linear(lat, lon) for lat, lon in pontos[:200])
+    assert achados == 200, achados
+    return {
+        'zonas': quantidade,
+        'compilar_ms': compilar * 1e3,
+        'bairro_us': por_chamada_us(lambda: zonas.by_neighbourhood('vila nova conceicao 4321')),
+        'bairro_na_mensagem_us': por_chamada_us(lambda: zonas.find_in_text('Vocês entregam no Jardim São Bento 4321?')),
+        'cep_us': por_chamada_us(lambda: zonas.by_cep('14321-000')),
+        'ponto_grade_us': por_chamada_us(lambda: [zonas.by_point(lat, lon) for lat, lon in pontos], numero=20) / len(pontos),
+        'ponto_linear_us': por_chamada_us(lambda: [ponto_linear(lat, lon) for lat, lon in pontos[:50]],
+                                          repeticoes=3, numero=2) / 50,
+    }
+
+SABORES = ('Calabresa', 'Muçarela', 'Portuguesa', 'Frango com Catupiry', 'Quatro Queijos', 'Margherita',
+           'Napolitana', 'Pepperoni', 'Baiana', 'Atum', 'Palmito', 'Bacon', 'Strogonoff', 'Brigadeiro',
+           'Chocolate com Morango', 'Prestígio', 'Toscana', 'Lombo Canadense', 'Carne Seca', 'Escarola', 'Milho',
+           'Brócolis', 'Alho e Óleo', 'Abobrinha', 'Camarão', 'Champignon', 'Costela', 'Picanha', 'Cheddar',
+           'Gorgonzola', 'Parmegiana', 'Rúcula com Tomate Seco', 'Peito de Peru', 'Banana com Canela',
+           'Romeu e Julieta', 'Nutella')
+BASES_CARDAPIO = (('Pizza', 'Pizzas'), ('Esfiha', 'Esfihas'), ('Calzone', 'Calzones'), ('Pastel', 'Pastéis'),
+                  ('Lanche', 'Lanches'), ('Porção', 'Porções'), ('Panqueca', 'Massas'), ('Crepe', 'Crepes'))
+VARIANTES = ('', 'Especial', 'da Casa', 'Tradicional', 'Premium', 'Light', 'Dupla', 'Recheada', 'Gourmet',
+             'Kids', 'Fit', 'Artesanal')
+# Perguntas com os erros de digitação e variações de grafia comuns no
+# WhatsApp, e o trecho que o nome do primeiro resultado deve ter
+PERGUNTAS_CARDAPIO = (
+    ('quanto custa a pizza de calabreza grande?', 'Pizza Calabresa'), ('tem pizza de mussarela?', 'Pizza Muçarela'),
+    ('muzzarela broto', 'Muçarela'), ('mozarela', 'Muçarela'), ('esfirra de carne seca', 'Esfiha Carne Seca'),
+    ('pastel de frango c catupiri', 'Pastel Frango com Catupiry'), ('pizza 4 queijo', 'Pizza Quatro Queijos'),
+    ('marguerita', 'Margherita'), ('peperoni', 'Pepperoni'), ('estrogonofe', 'Strogonoff'),
+    ('brigadero', 'Brigadeiro'), ('xocolate com morango', 'Chocolate com Morango'), ('prestigio', 'Prestígio'),
+    ('lombo canadence', 'Lombo Canadense'), ('brocolis', 'Brócolis'), ('camarao', 'Camarão'),
+    ('champinhon', 'Champignon'), ('parmigiana', 'Parmegiana'), ('calzone de atum', 'Calzone Atum'),
+    ('romeu e julieta', 'Romeu e Julieta'), ('rucula com tomate seco', 'Rúcula com Tomate Seco'),
+    ('panqueca de strogonoff', 'Panqueca Strogonoff'), ('pikanha', 'Picanha'), ('chedar', 'Cheddar'),
+    ('nutela', 'Nutella'), ('gorgonsola', 'Gorgonzola'), ('portugueza media', 'Portuguesa'),
+    ('crepe de banana c canela', 'Crepe Banana com Canela'), ('tocana', 'Toscana'), ('bahiana', 'Baiana'),
+)
+
+def config_cardapio(quantidade):
+    # Até len(BASES) x len(SABORES) x len(VARIANTES) itens; as pizzas têm tamanhos
+    config = config_exemplo()
+    itens = []
+    for variante in VARIANTES:
+        for base, categoria in BASES_CARDAPIO:
+            for sabor in SABORES:
+                if len(itens) == quantidade:
+                    break
+                item = {'id': f'i{len(itens)}', 'nome': f'{base} {sabor} {variante}'.strip(), 'categoria': categoria}
+                if base == 'Pizza':
+                    item['tamanhos'] = [{'nome': 'Broto', 'preco': 29.9}, {'nome': 'Média', 'preco': 39.9},
+                                        {'nome': 'Grande', 'preco': 49.9 + len(itens) % 7}]
+                    item['adicionais'] = [{'nome': 'Borda de Catupiry', 'preco': 8.0}]
+                else:
+                    item['preco'] = 9.9 + len(itens) % 20
+                itens.append(item)
+    config['cardapio']['itens'] = itens
+    return config
+
+@benchmark
+def bench_cardapio(quantidade=2500):
+    # Busca tolerante a erros no cardápio: consulta fria (sem cache de termos e
+    # de buscas), consulta repetida, acerto nas perguntas com erro de grafia e
+    # reindexação de um item alterado vs. compilar tudo de novo
+    config = config_cardapio(quantidade)
+    base = snapshot(config)
+    inicio = perf_counter()
+    catalogo = agente.MenuCatalog(base)
+    compilar = perf_counter() - inicio
+    acertos = 0
+    for pergunta, esperado in PERGUNTAS_CARDAPIO:
+        resultados = catalogo.search(pergunta, 1)
+        acertos += bool(resultados) and esperado in resultados[0][1].nome
+    frias = []
+    for _ in range(20):
+        for pergunta, _ in PERGUNTAS_CARDAPIO:
+            catalogo._cache_termos.clear()
+            catalogo._cache_buscas.clear()
+            inicio = perf_counter()
+            catalogo.search(pergunta)
+            frias.append(perf_counter() - inicio)
+    perguntas = [p for p, _ in PERGUNTAS_CARDAPIO]
+
+    alterada = json.loads(json.dumps(config))
+    alterada['cardapio']['itens'][17]['preco'] = 99.0
+    alterada['cardapio']['itens'].append({'nome': 'Guaraná 2L', 'preco': 12.0})
+    novo = snapshot(alterada)
+    inicio = perf_counter()
+    incremental = agente.MenuCatalog(novo, catalogo)
+    reindexar = perf_counter() - inicio
+    assert incremental._itens_por_termo == agente.MenuCatalog(novo)._itens_por_termo
+    return {
+        'itens': quantidade,
+        'termos': len(catalogo._itens_por_termo),
+        'compilar_ms': compilar * 1e3,
+        'reindexar_um_item_ms': reindexar * 1e3,
+        'acerto_com_erros_pct': 100.0 * acertos / len(PERGUNTAS_CARDAPIO),
+        'busca_fria_p50_us': percentil(frias, 50) * 1e6,
+        'busca_fria_p99_us': percentil(frias, 99) * 1e6,
+        'busca_repetida_us': por_chamada_us(lambda: [catalogo.search(p) for p in perguntas], numero=200) / len(perguntas),
+    }
+
+TEMAS_FAQ = ('estacionamento', 'wifi', 'cadeira de bebê', 'espaço kids', 'música ao vivo', 'reserva de mesa',
+             'festa de aniversário', 'nota fiscal', 'vale presente', 'cupom de desconto', 'massa sem glúten',
+             'opção vegana', 'comida sem lactose', 'acessibilidade', 'cachorro', 'pedido agendado', 'troco',
+             'rodízio', 'taxa de serviço', 'couvert', 'happy hour', 'cardápio infantil', 'talheres descartáveis',
+             'embalagem para viagem', 'fidelidade', 'encomenda para eventos', 'bolo', 'sobremesa', 'cerveja artesanal',
+             'vinho', 'chope', 'suco natural', 'refrigerante zero', 'molho extra', 'borda recheada', 'meia a meia',
+             'pizza doce', 'entrega agendada', 'retirada no balcão', 'pagamento na entrega')
+MODELOS_FAQ = ('vocês têm {t} na unidade {n}?', 'como funciona o {t} da loja {n}?', 'qual o preço do {t} na filial {n}?',
+               'o {t} está disponível no bairro {n}?', 'posso pedir {t} para o evento {n}?')
+
+def config_faq(quantidade):
+    # `quantidade` perguntas distintas (tema x modelo x número) com uma
+    # variação cada, como uma rede com muitas unidades
+    config = config_exemplo()
+    perguntas = []
+    for i in range(quantidade):
+        tema = TEMAS_FAQ[i % len(TEMAS_FAQ)]
+        modelo = MODELOS_FAQ[(i // len(TEMAS_FAQ)) % len(MODELOS_FAQ)]
+        numero = i // (len(TEMAS_FAQ) * len(MODELOS_FAQ))
+        perguntas.append({'pergunta': modelo.format(t=tema, n=numero), 'resposta': f'Resposta {i}',
+                          'variacoes': [f'{tema} {numero}?']})
+    config['faq']['perguntas'] = perguntas
+    return config
+
+def com_erro(texto, sorteio):
+    # Tira acentos e caixa e apaga uma letra de uma palavra longa, como no chat
+    palavras = agente.fold_text(texto).split()
+    longas = [i for i, p in enumerate(palavras) if len(p) > 5]
+    if longas:
+        i = sorteio.choice(longas)
+        j = sorteio.randrange(1, len(palavras[i]) - 1)
+        palavras[i] = palavras[i][:j] + palavras[i][j + 1:]
+    return ' '.join(palavras)
+
+@benchmark
+def bench_midia_cardapio(quantidade=2500):
+    # PDF do cardápio: renderização (no pool, fora do webhook), o que a
+    # primeira mensagem de uma conversa paga com o PDF da versão já pronto, e
+    # a mesma versão numa config nova (só personalidade mudou) sem renderizar.
+    # Confere também a falha de disco e o primeiro contato disputado.
+    diretorio = tempfile.mkdtemp(prefix='bench_midia_')
+    cache = agente.MediaCache(diretorio)
+    anterior = agente.midias
+    agente.midias = cache
+    try:
+        config = agente.snapshot_config(config_cardapio(quantidade), 1)
+        t0 = perf_counter()
+        arquivo = agente.menu_media(config).future().result()
+        renderizar = perf_counter() - t0
+        primeira = por_chamada_us(lambda: agente.menu_media(config).future().add_done_callback(lambda f: f.result()))
+        nova = json.loads(json.dumps(config))
+        nova['personalidade']['nome'] = 'Outra'
+        nova = agente.snapshot_config(nova, 2)
+        agente.inherit_derived(config, nova)
+        agente.menu_media(nova).future().result()
+        stats = cache.stats()
+        ler = por_chamada_us(lambda: cache.read(arquivo.nome))
+
+        # Disco cheio no rename: serve da memória e não deixa o .midia.* para trás
+        substituir = os.replace
+
+        def sem_espaco(origem, destino):
+            raise OSError(28, 'No space left on device')
+        os.replace = sem_espaco
+        try:
+            falhou = cache.submit(lambda: b'%PDF-1.4 sem disco', 'pdf').result()
+        finally:
+            os.replace = substituir
+        assert cache.read(falhou.nome) == b'%PDF-1.4 sem disco'
+        assert not glob.glob(os.path.join(diretorio, '.midia.*')), os.listdir(diretorio)
+
+        # Duas mensagens da mesma conversa ao mesmo tempo: só uma leva o PDF,
+        # e a marca sobrevive à ida da sessão para o SQLite
+        sessoes = agente.SessionStore(caminho_db=os.path.join(diretorio, 'sessoes.db'))
+        largada = threading.Barrier(16)
+        ganhou = []
+
+        def primeira_mensagem():
+            largada.wait()
+            ganhou.append(sessoes.first_contact('megacode-bench', '5511900000000@s.whatsapp.net'))
+        threads = [threading.Thread(target=primeira_mensagem) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert ganhou.count(True) == 1, ganhou
+        sessoes.close()
+        assert not sessoes.first_contact('megacode-bench', '5511900000000@s.whatsapp.net')
+        assert sessoes.stats()['loaded'] == 1, sessoes.stats()
+    finally:
+        agente.midias = anterior
+        cache.close()
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {
+        'itens': quantidade,
+        'renderizar_ms': renderizar * 1e3,
+        'pdf_kb': arquivo.tamanho / 1024,
+        'primeira_mensagem_us': primeira,
+        'renderizacoes': stats['rendered'],
+        'servir_us': ler,
+    }
+
+@benchmark
+def bench_faq(quantidade=10000, consultas=500):
+    # Busca por similaridade com `quantidade` perguntas: compilar, reaproveitar
+    # os vetores depois de um save, uma busca (sem cache), a mesma busca em
+    # lotes de 256 e o acerto com as perguntas digitadas com erro
+    if agente.np is None:
+        return {'numpy': 0}
+    config = config_faq(quantidade)
+    base = snapshot(config)
+    inicio = perf_counter()
+    indice = agente.FaqIndex(base)
+    compilar = perf_counter() - inicio
+    sorteio = random.Random(7)
+    escolhidas = [sorteio.randrange(quantidade) for _ in range(consultas)]
+    perguntas = [com_erro(config['faq']['perguntas'][i]['pergunta'], sorteio) for i in escolhidas]
+    acertos = sum(indice.search(p, 1)[0][1] == i for p, i in zip(perguntas, escolhidas))
+
+    tempos = []
+    for pergunta in perguntas:
+        indice._cache.clear()
+        inicio = perf_counter()
+        indice.search(pergunta)
+        tempos.append(perf_counter() - inicio)
+    indice._cache.clear()
+    inicio = perf_counter()
+    for i in range(0, consultas, 256):
+        indice.search_batch(perguntas[i:i + 256])
+    lote = (perf_counter() - inicio) / consultas
+
+    alterada = json.loads(json.dumps(config))
+    alterada['faq']['perguntas'].append({'pergunta': 'Tem tomada para carregar o celular?', 'resposta': 'Tem!'})
+    novo = snapshot(alterada)
+    inicio = perf_counter()
+    agente.FaqIndex(novo, indice)
+    reaproveitar = perf_counter() - inicio
+    return {
+        'perguntas': quantidade,
+        'textos': indice._matriz.shape[1],
+        'matriz_mb': indice._matriz.nbytes / 2 ** 20,
+        'compilar_ms': compilar * 1e3,
+        'recompilar_com_vetores_ms': reaproveitar * 1e3,
+        'acerto_com_erros_pct': 100.0 * acertos / consultas,
+        'busca_p50_us': percentil(tempos, 50) * 1e6,
+        'busca_p99_us': percentil(tempos, 99) * 1e6,
+        'busca_em_lote_us': lote * 1e6,
+    }
+
+@benchmark
+def bench_tenants(total=2000, capacidade=1000, consultas=50000):
+    # Muitos restaurantes num processo: custo de achar o tenant (hit no LRU),
+    # custo de um tenant frio (disco + compilação) e memória por tenant ativo
+    diretorio = tempfile.mkdtemp(prefix='bench_tenants_')
+    try:
+        for i in range(total):
+            with open(os.path.join(diretorio, f'loja-{i}.json'), 'w', encoding='utf-8') as f:
+                json.dump(config_sempre_aberta(), f)
+        registro = agente.TenantRegistry(diretorio, capacidade=capacidade)
+
+        def atender(tenant):
+            config = registro.get(tenant).get()
+            return agente.generate_test_response('qual o cardápio?', config)
+
+        tracemalloc.start()
+        antes = tracemalloc.get_traced_memory()[0]
+        t0 = perf_counter()
+        for i in range(capacidade):
+            atender(f'loja-{i}')
+        frio = (perf_counter() - t0) / capacidade
+        memoria = (tracemalloc.get_traced_memory()[0] - antes) / capacidade
+        tracemalloc.stop()
+
+        quentes = [f'loja-{random.randrange(capacidade)}' for _ in range(consultas)]
+        t0 = perf_counter()
+        for tenant in quentes:
+            registro.get(tenant)
+        lookup = (perf_counter() - t0) / consultas
+        t0 = perf_counter()
+        for tenant in quentes:
+            atender(tenant)
+        mensagem = (perf_counter() - t0) / consultas
+
+        # Tráfego espalhado por todos os tenants (metade não cabe no LRU)
+        espalhados = [f'loja-{random.randrange(total)}' for _ in range(consultas // 10)]
+        t0 = perf_counter()
+        for tenant in espalhados:
+            atender(tenant)
+        misto = (perf_counter() - t0) / len(espalhados)
+        return {
+            'tenants_ativos': registro.stats()['active'],
+            'lookup_hit_us': lookup * 1e6,
+            'mensagem_tenant_quente_us': mensagem * 1e6,
+            'mensagem_tenant_frio_us': frio * 1e6,
+            'mensagem_trafego_espalhado_us': misto * 1e6,
+            'memoria_por_tenant_kb': memoria / 1024,
+            'evictions': registro.stats()['evictions'],
+        }
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def corpus_webhook():
+    # Payloads reais documentados pelo megaAPI (attached_assets), mais as
+    # variantes que o caminho rápido deve descartar
+    aqui = os.path.dirname(os.path.abspath(__file__))
+    arquivo = glob.glob(os.path.join(aqui, 'Pasted--Exemplos-dos-retorno-do-webhook-megaAPI*.txt'))[0]
+    with open(arquivo, encoding='utf-8') as f:
+        blocos = re.findall(r'```json\s*\n(.*?)```', f.read(), re.S)
+    corpus = [json.loads(b) for b in blocos]
+    proprias = []
+    for dados in corpus[:3]:
+        copia = json.loads(json.dumps(dados))
+        copia['key']['fromMe'] = True
+        proprias.append(copia)
+    status = json.loads(json.dumps(corpus[0]))
+    status['key']['remoteJid'] = 'status@broadcast'
+    return [json.dumps(d, ensure_ascii=False).encode('utf-8') for d in corpus + proprias + [status]]
+
+def variantes_citadas(corpo):
+    # Respostas a mensagens citadas: o texto da citação (contextInfo.quotedMessage)
+    # não é o que o cliente escreveu
+    por_tipo = {json.loads(b)['messageType']: json.loads(b) for b in reversed(corpo)}
+    citada = {'stanzaId': '3EB0C1TADA', 'quotedMessage': {'conversation': 'texto citado'}}
+    imagem = por_tipo['imageMessage']
+    imagem['message'] = {'imageMessage': {'mimetype': 'image/jpeg', 'contextInfo': citada}}
+    legenda = json.loads(json.dumps(imagem))
+    legenda['message']['imageMessage']['caption'] = 'tem dessa?'
+    texto = por_tipo['extendedTextMessage']
+    texto['message'] = {'extendedTextMessage': {'contextInfo': citada, 'text': 'quero essa pizza'}}
+    return [json.dumps(d, ensure_ascii=False).encode('utf-8') for d in (imagem, legenda, texto)]
+
+def verificar_paridade_webhook(corpo):
+    # O caminho rápido tem que ler o mesmo que o json.loads completo
+    campos = ('instance_key', 'remote_jid', 'message_id', 'from_me', 'timestamp', 'message_type', 'ignored')
+    for bruto in corpo:
+        rapido = agente.parse_megaapi_webhook(bruto)
+        completo = agente._parse_megaapi_full(json.loads(bruto))
+        for campo in campos:
+            assert getattr(rapido, campo) == getattr(completo, campo), (campo, bruto[:200])
+        if not completo.ignored:
+            assert rapido.text == completo.text, (rapido.text, completo.text, bruto[:200])
+
+def verificar_webhook_config_salva(cliente, bruto):
+    # Instância sem config própria responde com a config salva pela página
+    # (agent_config.json), nunca com o padrão; sem nada salvo, não responde
+    dados = json.loads(bruto)
+    dados['message'] = {'conversation': 'oi'}
+
+    def enviar(instance_key):
+        dados['instance_key'] = instance_key
+        dados['key']['id'] = os.urandom(8).hex().upper()
+        return cliente.post('/webhook/megaapi', json=dados).json
+
+    assert enviar('megacode-api') == {'success': True, 'ignored': 'sem_config'}
+    config = config_sempre_aberta()
+    config['restaurante']['nome'] = 'Pizzaria Don Giuseppe'
+    assert cliente.post('/api/save-config', json=config).status_code == 200
+    resposta = enviar('megacode-api')['response']
+    assert 'Pizzaria Don Giuseppe' in resposta and 'Meu Restaurante' not in resposta, resposta
+    # Tenant com config gravada continua respondendo com a dele
+    propria = config_sempre_aberta()
+    propria['restaurante']['nome'] = 'Cantina da Loja 2'
+    assert agente.tenants.get('loja2').save(propria)
+    resposta = enviar('loja2')['response']
+    assert 'Cantina da Loja 2' in resposta, resposta
+
+def verificar_segredo_webhook(cliente, bruto):
+    # Com envio ativo (MEGAAPI_TOKEN), só entra quem traz o AGENT_WEBHOOK_TOKEN;
+    # sem o segredo configurado, nada entra
+    token_original, fila_original = agente.WEBHOOK_TOKEN, agente.outbound
+
+    def enviar(url, **cabecalhos):
+        return cliente.post(url, data=bruto, content_type='application/json', headers=cabecalhos).status_code
+
+    try:
+        agente.outbound = object()  # a checagem vem antes de qualquer envio
+        agente.WEBHOOK_TOKEN = None
+        assert enviar('/webhook/megaapi') == 403
+        agente.WEBHOOK_TOKEN = 'segredo-bench'
+        assert enviar('/webhook/megaapi') == 403
+        assert enviar('/webhook/megaapi?token=outro') == 403
+        assert enviar('/webhook/megaapi', **{'X-Webhook-Token': 'outro'}) == 403
+        agente.outbound = None
+        assert enviar('/webhook/megaapi?token=segredo-bench') == 200
+        assert enviar('/webhook/megaapi', **{'X-Webhook-Token': 'segredo-bench'}) == 200
+    finally:
+        agente.WEBHOOK_TOKEN, agente.outbound = token_original, fila_original
+
+@benchmark
+def bench_webhook():
+    corpo = corpus_webhook()
+    verificar_paridade_webhook(corpo + variantes_citadas(corpo))
+
+    def completo():
+        for bruto in corpo:
+            agente._parse_megaapi_full(json.loads(bruto))
+
+    def rapido():
+        for bruto in corpo:
+            agente.parse_megaapi_webhook(bruto)
+
+    cliente = agente.app.test_client()
+    diretorio = tempfile.mkdtemp(prefix='bench_webhook_')
+    registro_original, store_original = agente.tenants, agente.config_store
+    agente.tenants = agente.TenantRegistry(os.path.join(diretorio, 'tenants'))
+    agente.config_store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+    try:
+        verificar_webhook_config_salva(cliente, corpo[1])
+        verificar_segredo_webhook(cliente, corpo[1])
+        endpoint = por_chamada_us(
+            lambda: [cliente.post('/webhook/megaapi', data=b, content_type='application/json') for b in corpo],
+            repeticoes=3, numero=20) / len(corpo)
+    finally:
+        agente.tenants, agente.config_store = registro_original, store_original
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {
+        'payloads': len(corpo),
+        'bytes_medio': sum(map(len, corpo)) / len(corpo),
+        'json_completo_us': por_chamada_us(completo, numero=500) / len(corpo),
+        'caminho_rapido_us': por_chamada_us(rapido, numero=500) / len(corpo),
+        'endpoint_flask_us': endpoint,
+    }
+
+@benchmark
+def bench_dedup(mensagens=50000, taxa_reenvio=0.1):
+    # Fluxo com ~10% de reenvios: custo por checagem em memória e com SQLite
+    ids = [f'ID{i:08d}' for i in range(mensagens)]
+    fluxo = []
+    for i, id_ in enumerate(ids):
+        fluxo.append(id_)
+        if random.random() < taxa_reenvio:
+            fluxo.append(ids[random.randrange(max(0, i - 50), i + 1)])
+    resultado = {}
+    diretorio = tempfile.mkdtemp(prefix='bench_dedup_')
+    try:
+        for modo, caminho in (('memoria', None), ('sqlite', os.path.join(diretorio, 'dedup.db'))):
+            dedup = agente.MessageDeduplicator(ttl=600, capacidade=mensagens, caminho_db=caminho)
+            t0 = perf_counter()
+            for id_ in fluxo:
+                dedup.seen('megacode-api', id_)
+            resultado[f'{modo}_us'] = (perf_counter() - t0) / len(fluxo) * 1e6
+            resultado[f'{modo}_taxa_duplicadas'] = dedup.stats()['duplicate_rate']
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return resultado
+
+class StubMegaApi(BaseHTTPRequestHandler):
+    # Servidor local que imita o /rest/sendMessage do megaAPI, com latência fixa
+    protocol_version = 'HTTP/1.1'
+    latencia = 0.05
+    recebidas = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        dados = json.loads(self.rfile.read(int(self.headers['Content-Length'])))['messageData']
+        sleep(self.latencia)
+        self.recebidas.append((dados['to'], dados['text'], perf_counter()))
+        corpo = b'{"error": false, "message": "ok"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+@benchmark
+def bench_envio(conversas=20, mensagens=10, tempo_resposta=0.5, taxa=50, rajada=10):
+    # Webhook com tempo_resposta: quanto o request segura o worker e quanto
+    # tempo a fila leva para entregar tudo. Contra o stub, confere que cada
+    # conversa recebe na ordem, que a instância não passa de `taxa` envios/s
+    # (além da rajada) e que respostas prontas juntas saem numa chamada só.
+    StubMegaApi.recebidas = []
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), StubMegaApi)
+    servidor.request_queue_size = 64
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    cliente = agente.MegaApiClient(f'http://127.0.0.1:{servidor.server_port}', 'token-teste')
+    fila = agente.OutboundQueue(cliente.send_text, taxa=taxa, rajada=rajada, max_lote=1)
+    try:
+        t0 = perf_counter()
+        for i in range(mensagens):
+            for c in range(conversas):
+                fila.enqueue('megacode-bench', f'55119{c:08d}@s.whatsapp.net', f'resposta {i}', tempo_resposta)
+        enfileirar = (perf_counter() - t0) / (conversas * mensagens)
+        fila.close(timeout=120)
+        total = perf_counter() - t0
+        recebidas = StubMegaApi.recebidas
+        StubMegaApi.recebidas = []
+        # A primeira sai sozinha; as que chegam enquanto ela está no stub
+        # (latência de 50ms) ficam prontas juntas e vão numa chamada só
+        juntas = agente.OutboundQueue(cliente.send_text, taxa=0, max_lote=5)
+        juntas.enqueue('megacode-bench', '5511900000000@s.whatsapp.net', 'parte 0')
+        sleep(StubMegaApi.latencia / 2)
+        for i in range(1, 6):
+            juntas.enqueue('megacode-bench', '5511900000000@s.whatsapp.net', f'parte {i}')
+        juntas.close(timeout=30)
+        agrupadas = StubMegaApi.recebidas
+    finally:
+        servidor.shutdown()
+    stats = fila.stats()
+    assert stats['sent'] == conversas * mensagens and stats['failed'] == 0, stats
+    por_conversa = {}
+    for para, texto, _ in recebidas:
+        por_conversa.setdefault(para, []).append(texto)
+    esperado = [f'resposta {i}' for i in range(mensagens)]
+    assert len(por_conversa) == conversas and all(t == esperado for t in por_conversa.values()), por_conversa
+    # Balde de fichas: depois da rajada, no máximo `taxa` envios por segundo
+    duracao = recebidas[-1][2] - recebidas[0][2]
+    minimo = (conversas * mensagens - rajada) / taxa
+    assert duracao >= minimo * 0.95, (duracao, minimo)
+    lote = '\n\n'.join(f'parte {i}' for i in range(1, 6))
+    assert [t for _, t, _ in agrupadas] == ['parte 0', lote], agrupadas
+    return {
+        'enfileirar_us': enfileirar * 1e6,
+        'bloqueio_sincrono_ms': (tempo_resposta + StubMegaApi.latencia) * 1e3,
+        'entregues': stats['sent'],
+        'tempo_total_s': total,
+        'envios_por_s': stats['sent'] / (total - tempo_resposta),
+        'conexoes_http': cliente.pool.connections,
+    }
+
+class StubOpenAI(BaseHTTPRequestHandler):
+    # Servidor local compatível com /v1/chat/completions, com latência ajustável
+    protocol_version = 'HTTP/1.1'
+    latencia = 0.2
+    chamadas = 0
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        pedido = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        StubOpenAI.chamadas += 1
+        sleep(self.latencia)
+        pergunta = pedido['messages'][-1]['content']
+        corpo = json.dumps({
+            'id': 'chatcmpl-bench', 'object': 'chat.completion', 'created': 0, 'model': pedido['model'],
+            'choices': [{'index': 0, 'finish_reason': 'stop',
+                         'message': {'role': 'assistant', 'content': f'Resposta da IA para: {pergunta}'}}],
+            'usage': {'prompt_tokens': 1, 'completion_tokens': 1, 'total_tokens': 2},
+        }).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+@benchmark
+def bench_ia(simultaneas=20, latencia=0.2):
+    # Respostas pela IA contra um servidor falso: miss, hit de cache,
+    # perguntas iguais simultâneas, orçamento estourado e save que muda o prompt
+    import openai
+    StubOpenAI.latencia = latencia
+    StubOpenAI.chamadas = 0
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), StubOpenAI)
+    servidor.request_queue_size = 64
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    cliente = openai.OpenAI(api_key='sk-bench', base_url=f'http://127.0.0.1:{servidor.server_port}/v1', max_retries=0)
+    diretorio = tempfile.mkdtemp(prefix='bench_ia_')
+    store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+    store.save(config_sempre_aberta())
+    config = store.get()
+    anterior = agente.responder
+    try:
+        ia = agente.LlmResponder(cliente, orcamento=5.0)
+        t0 = perf_counter()
+        ia.respond('Qual o cardápio?', config)
+        miss = perf_counter() - t0
+        hit = por_chamada_us(lambda: ia.respond('qual o cardapio', config), numero=1000)
+        assert StubOpenAI.chamadas == 1, StubOpenAI.chamadas
+
+        chamadas_antes = StubOpenAI.chamadas
+        threads = [threading.Thread(target=ia.respond, args=('Vocês entregam no centro?', config))
+                   for _ in range(simultaneas)]
+        t0 = perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        coalescidas = perf_counter() - t0
+        chamadas_coalescidas = StubOpenAI.chamadas - chamadas_antes
+        assert chamadas_coalescidas == 1, chamadas_coalescidas
+        assert ia.stats()['coalesced'] == simultaneas - 1, ia.stats()
+
+        # Orçamento menor que a latência: o webhook cai na palavra-chave
+        lenta = agente.LlmResponder(cliente, orcamento=latencia / 4)
+        agente.responder = lenta
+        t0 = perf_counter()
+        resposta = agente.generate_response('tem promoção?', config)
+        fallback = perf_counter() - t0
+        assert lenta.stats()['timeouts'] == 1, lenta.stats()
+        assert resposta == agente.generate_test_response('tem promoção?', config), resposta
+        assert resposta.startswith('Promoções'), resposta
+        # A chamada seguiu em segundo plano e a resposta ficou no cache
+        sleep(latencia * 2)
+        chamadas_antes = StubOpenAI.chamadas
+        assert lenta.respond('tem promoção?', config) == 'Resposta da IA para: tem promoção?'
+        assert StubOpenAI.chamadas == chamadas_antes
+
+        # Save que muda o prompt: a mesma pergunta volta a ir à API
+        def renomear(atual):
+            atual['personalidade']['nome'] = 'Assistente Nova'
+            return atual
+        assert store.update(renomear)
+        nova = store.get()
+        assert agente.system_prompt(nova).digest != agente.system_prompt(config).digest
+        chamadas_antes = StubOpenAI.chamadas
+        assert ia.respond('Qual o cardápio?', nova) is not None
+        assert StubOpenAI.chamadas == chamadas_antes + 1, StubOpenAI.chamadas
+        assert ia.respond('Qual o cardápio?', config) is not None
+        assert StubOpenAI.chamadas == chamadas_antes + 1, StubOpenAI.chamadas
+    finally:
+        agente.responder = anterior
+        servidor.shutdown()
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {
+        'miss_ms': miss * 1e3,
+        'hit_us': hit,
+        f'{simultaneas}_iguais_ms': coalescidas * 1e3,
+        f'{simultaneas}_iguais_chamadas': chamadas_coalescidas,
+        'fallback_ms': fallback * 1e3,
+    }
+
+@benchmark
+def bench_sessoes(conversas=100000, turnos=3):
+    # 100 mil conversas simultâneas com alguns turnos cada: bytes por sessão
+    # (tracemalloc, inclui a chave e o texto do cliente) e custo de registrar
+    config = snapshot(config_sempre_aberta())
+    motor = agente.intent_engine(config)
+    store = agente.SessionStore(capacidade=conversas)
+    jids = [f'55119{i:08d}@s.whatsapp.net' for i in range(conversas)]
+    textos = [(m, motor.render(motor.match(m)), motor.match(m)) for m in MENSAGENS]
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    t0 = perf_counter()
+    for t in range(turnos):
+        for i, jid in enumerate(jids):
+            cliente, agente_, intencao = textos[(i + t) % len(textos)]
+            store.record('megacode-bench', jid, f'{cliente} #{i}', agente_, intencao)
+    registrar = (perf_counter() - t0) / (conversas * turnos)
+    memoria = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    historico = por_chamada_us(lambda: store.history('megacode-bench', jids[12345]), numero=20000)
+
+    diretorio = tempfile.mkdtemp(prefix='bench_sessoes_')
+    try:
+        frio = agente.SessionStore(capacidade=conversas // 10, caminho_db=os.path.join(diretorio, 'sessoes.db'))
+        t0 = perf_counter()
+        for i, jid in enumerate(jids):
+            frio.record('megacode-bench', jid, f'oi #{i}', 'Olá!')
+        com_spill = (perf_counter() - t0) / conversas
+        t0 = perf_counter()
+        for jid in jids[:1000]:
+            frio.history('megacode-bench', jid)
+        recarregar = (perf_counter() - t0) / 1000
+        spilled = frio.stats()['spilled']
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {
+        'sessoes': store.stats()['active'],
+        'bytes_por_sessao': memoria / conversas,
+        'memoria_total_mb': memoria / 2 ** 20,
+        'registrar_turno_us': registrar * 1e6,
+        'historico_us': historico,
+        'registrar_com_spill_us': com_spill * 1e6,
+        'sessoes_no_sqlite': spilled,
+        'recarregar_do_sqlite_us': recarregar * 1e6,
+    }
+
+@benchmark
+def bench_eventos(total=2000000, registrados=200000):
+    # Registro de eventos: custo de record() no webhook (só memória), vazão
+    # da gravação em lote e consultas de resumo sobre milhões de eventos,
+    # antes e depois de compactar em contagens por hora
+    config = snapshot(config_exemplo())
+    motor = agente.intent_engine(config)
+    intencoes = [(m, motor.match(m)) for m in MENSAGENS]
+    agora = agente.clock.now()
+    diretorio = tempfile.mkdtemp(prefix='bench_eventos_')
+    try:
+        log = agente.EventLog(os.path.join(diretorio, 'eventos.db'), max_buffer=registrados)
+        t0 = perf_counter()
+        for i in range(registrados):
+            texto, intencao = intencoes[i % len(intencoes)]
+            log.record('megacode-bench', config, agora, intencao, texto)
+        registrar = (perf_counter() - t0) / registrados
+        log.close()
+        # O resto entra direto em lotes de 30 dias de 50 lojas, em ordem de chegada
+        sorteio = random.Random(24)
+        inicio = int(agora.timestamp()) - 30 * 86400
+        passo = 30 * 86400 / (total - registrados)
+        t0 = perf_counter()
+        for base in range(registrados, total, 50000):
+            lote = []
+            for i in range(base, min(base + 50000, total)):
+                ts = inicio + int((i - registrados) * passo)
+                texto, intencao = intencoes[sorteio.randrange(len(intencoes))]
+                hora = ts // 3600 % 24
+                lote.append((ts, f'loja{sorteio.randrange(50)}', ts // 86400 % 7, hora, intencao,
+                             int(18 <= hora < 24), texto if intencao == agente.INTENCAO_PADRAO else None))
+            log._gravar(lote)
+        gravar = (perf_counter() - t0) / max(total - registrados, 1)
+        t0 = perf_counter()
+        resumo = log.summary(desde=0)
+        resumo_s = perf_counter() - t0
+        t0 = perf_counter()
+        log.summary('loja7', desde=inicio + 20 * 86400)
+        resumo_loja_s = perf_counter() - t0
+        t0 = perf_counter()
+        compactados = log.compact(inicio + 23 * 86400)
+        compactar_s = perf_counter() - t0
+        t0 = perf_counter()
+        depois = log.summary(desde=0)
+        resumo_compactado_s = perf_counter() - t0
+        assert depois['top_intents'] == resumo['top_intents'] and depois['events'] == resumo['events']
+        exportar_s = None
+        if agente.np is not None:
+            t0 = perf_counter()
+            log.export(os.path.join(diretorio, 'eventos.npz'), desde=0)
+            exportar_s = perf_counter() - t0
+        tamanho = os.path.getsize(os.path.join(diretorio, 'eventos.db'))
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    resultado = {
+        'eventos': resumo['events'],
+        'registrar_us': registrar * 1e6,
+        'gravar_por_s': 1 / gravar,
+        'resumo_s': resumo_s,
+        'resumo_uma_loja_s': resumo_loja_s,
+        'compactar_s': compactar_s,
+        'compactados': compactados,
+        'resumo_compactado_s': resumo_compactado_s,
+        'banco_mb': tamanho / 2 ** 20,
+    }
+    if exportar_s is not None:
+        resultado['exportar_s'] = exportar_s
+    return resultado
+
+def verificar_save_da_pagina(cliente):
+    # O save da página (collectConfig) manda só restaurante, personalidade,
+    # comportamento e horario: cardápio e perguntas frequentes têm que ficar
+    diretorio = tempfile.mkdtemp(prefix='bench_paginas_')
+    store_original = agente.config_store
+    try:
+        agente.config_store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+        config = config_exemplo()
+        config['cardapio']['itens'] = [{'nome': 'Pizza Calabresa', 'preco': 45.0}]
+        config['faq'] = {'perguntas': [{'pergunta': 'Tem estacionamento?', 'resposta': 'Temos!'}], 'limiar': 0.6}
+        agente.save_config(config)
+        pagina = {secao: config[secao] for secao in ('restaurante', 'personalidade', 'comportamento', 'horario')}
+        pagina['personalidade'] = dict(pagina['personalidade'], nome='Outra')
+        resposta = cliente.post('/api/save-config', json=pagina)
+        assert resposta.status_code == 200 and resposta.json['changed'] == ['personalidade'], resposta.json
+        salva = agente.thaw_config(agente.load_config())
+        assert salva['faq'] == config['faq'] and salva['cardapio'] == config['cardapio'], salva
+    finally:
+        agente.config_store = store_original
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+def verificar_campos_da_pagina(cliente):
+    # Campos que o collectConfig manda têm que sair do formulário, renderizado
+    # com a config salva, e não de um valor fixo que o save reverteria
+    diretorio = tempfile.mkdtemp(prefix='bench_paginas_')
+    store_original = agente.config_store
+    try:
+        agente.config_store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+        config = config_exemplo()
+        config['comportamento']['enviar_cardapio_automatico'] = False
+        config['comportamento']['tempo_resposta'] = 7
+        config['restaurante'].update(cidade='Manaus', estado='AM', retirada=False)
+        agente.save_config(config)
+        pagina = cliente.get('/config').get_data(as_text=True)
+        assert re.search(r'<input type="checkbox" id="enviarCardapio"\s*>', pagina)
+        assert "enviar_cardapio_automatico: getChecked('enviarCardapio')" in pagina
+        assert f'id="tempoResposta" value="7" min="0" max="{agente.TEMPO_RESPOSTA_MAX}"' in pagina
+        assert "tempo_resposta: parseFloat(getValue('tempoResposta'))" in pagina
+        assert 'id="restauranteCidade" value="Manaus"' in pagina and 'id="restauranteEstado" value="AM"' in pagina
+        assert re.search(r'<input type="checkbox" id="restauranteRetirada"\s*>', pagina)
+        assert re.search(r'<input type="checkbox" id="restauranteDelivery"\s*checked>', pagina)
+        for campo, elemento in (('cidade', 'restauranteCidade'), ('estado', 'restauranteEstado')):
+            assert f"{campo}: getValue('{elemento}')" in pagina, campo
+        for campo, elemento in (('delivery', 'restauranteDelivery'), ('retirada', 'restauranteRetirada')):
+            assert f"{campo}: getChecked('{elemento}')" in pagina, campo
+    finally:
+        agente.config_store = store_original
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+@benchmark
+def bench_paginas():
+    # /config: render_template_string a cada GET vs. página pronta por versão,
+    # e o 304 de quem já tem a página; /teste comprimido
+    from flask import render_template_string
+    cliente = agente.app.test_client()
+    verificar_save_da_pagina(cliente)
+    verificar_campos_da_pagina(cliente)
+    config = agente.config_store.get()
+    with agente.app.test_request_context():
+        original = por_chamada_us(lambda: render_template_string(agente.CONFIG_TEMPLATE, config=config), numero=200)
+    pagina = cliente.get('/config')
+    etag = pagina.headers['ETag']
+    teste = cliente.get('/teste', headers={'Accept-Encoding': 'gzip'})
+    return {
+        'render_original_us': original,
+        'config_get_us': por_chamada_us(lambda: cliente.get('/config'), numero=200),
+        'config_304_us': por_chamada_us(lambda: cliente.get('/config', headers={'If-None-Match': etag}), numero=200),
+        'config_bytes': len(pagina.data),
+        'config_gzip_bytes': len(agente.config_page(config).gzip),
+        'teste_bytes': len(agente.PAGINA_TESTE.body),
+        'teste_gzip_bytes': len(teste.data),
+    }
+
+@benchmark
+def bench_status():
+    # /api/status: jsonify do bloco inteiro a cada GET vs. corpo pré-serializado
+    from datetime import datetime
+    from flask import jsonify
+    config = snapshot(config_exemplo())
+
+    def original():
+        return jsonify({
+            'current_time': datetime.now().strftime('%H:%M'),
+            'current_day': agente.get_current_day_name(),
+            'status': agente.is_restaurant_open(config),
+            'restaurant_info': config['restaurante'],
+        })
+
+    with agente.app.app_context():
+        jsonify_us = por_chamada_us(original)
+    feed = agente.status_feed(config)
+    cliente = agente.app.test_client()
+    return {
+        'jsonify_original_us': jsonify_us,
+        'corpo_pronto_us': por_chamada_us(lambda: feed.body_at(datetime.now())),
+        'endpoint_us': por_chamada_us(lambda: cliente.get('/api/status'), numero=500),
+    }
+
+@benchmark
+def bench_recompilacao(rodadas=50):
+    # Depois de um save, quanto custa deixar prontas de novo as estruturas
+    # derivadas (agenda, status, intenções, prompt) mudando só usar_emojis
+    # vs. mudando o horário. O save em si (fsync) fica fora da medida.
+    diretorio = tempfile.mkdtemp(prefix='bench_recompilacao_')
+    store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+    config = config_muitas_promocoes()
+
+    def aquecer(snapshot):
+        agente.weekly_schedule(snapshot)
+        agente.status_feed(snapshot).body_at(datetime.now())
+        motor = agente.intent_engine(snapshot)
+        for intencao, *_ in agente.INTENCOES:
+            motor.render(intencao)
+        agente.system_prompt(snapshot)
+
+    def rodar(mudar):
+        tempos = []
+        for i in range(rodadas):
+            mudar(i)
+            store.save(config)
+            snapshot = store.get()
+            inicio = perf_counter()
+            aquecer(snapshot)
+            tempos.append(perf_counter() - inicio)
+        return percentil(tempos, 50) * 1e6
+
+    def emojis(i):
+        config['personalidade']['usar_emojis'] = bool(i % 2)
+
+    def horario(i):
+        config['horario']['segunda']['inicio'] = f"{17 + i % 2}:00"
+
+    try:
+        store.save(config)
+        aquecer(store.get())
+        resultado = {'recompilar_so_personalidade_us': rodar(emojis), 'recompilar_horario_us': rodar(horario)}
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return resultado
+
+class IaContadora:
+    # Responder falso: conta as chamadas que iriam à API
+    def __init__(self):
+        self.chamadas = 0
+
+    def respond(self, message, config, historico=()):
+        self.chamadas += 1
+        return f'IA: {message}'
+
+def verificar_lote_sem_ia(cliente):
+    # Lote anônimo com a IA ligada: nenhuma chamada à API, mesmo com
+    # "llm": true (403); com ADMIN_TOKEN, até MAX_LOTE_TESTE_IA mensagens
+    ia, anteriores = IaContadora(), (agente.responder, agente.ADMIN_TOKEN)
+    rascunho = config_sempre_aberta()
+    perguntas = ['vocês entregam no centro?', 'aceita pix?', 'qual o horário?'] * 10
+    try:
+        agente.responder, agente.ADMIN_TOKEN = ia, 'segredo-admin'
+        resposta = cliente.post('/api/test-agent/batch', json={'messages': perguntas, 'config': rascunho})
+        linhas = [json.loads(l) for l in resposta.get_data().splitlines()]
+        assert len(linhas) == len(perguntas) and ia.chamadas == 0, (len(linhas), ia.chamadas)
+        assert all(not l['response'].startswith('IA:') for l in linhas), linhas[0]
+        resposta = cliente.post('/api/test-agent/batch', json={'messages': perguntas, 'llm': True})
+        assert resposta.status_code == 403 and ia.chamadas == 0, (resposta.status_code, ia.chamadas)
+        admin = {'Authorization': 'Bearer segredo-admin'}
+        demais = ['oi'] * (agente.MAX_LOTE_TESTE_IA + 1)
+        resposta = cliente.post('/api/test-agent/batch', json={'messages': demais, 'llm': True}, headers=admin)
+        assert resposta.status_code == 413 and ia.chamadas == 0, (resposta.status_code, ia.chamadas)
+        resposta = cliente.post('/api/test-agent/batch', json={'messages': perguntas, 'config': rascunho, 'llm': True},
+                                headers=admin)
+        resposta.get_data()
+        assert resposta.status_code == 200 and ia.chamadas > 0, (resposta.status_code, ia.chamadas)
+    finally:
+        agente.responder, agente.ADMIN_TOKEN = anteriores
+
+@benchmark
+def bench_lote_teste(mensagens=50000, amostra=2000):
+    # Corpus de regressão: um POST /api/test-agent por mensagem (medido numa
+    # amostra) vs. /api/test-agent/batch com o corpus inteiro e um rascunho
+    corpus = [random.choice(CORPUS_PT) for _ in range(mensagens)]
+    config = config_muitas_promocoes()
+    cliente = agente.app.test_client()
+    diretorio = tempfile.mkdtemp(prefix='bench_lote_')
+    store_original = agente.config_store
+    try:
+        agente.config_store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), janela_gravacao=0)
+        agente.save_config(config)
+        with relogio_congelado(MOMENTOS['sexta_21h']):
+            inicio = perf_counter()
+            for texto in corpus[:amostra]:
+                cliente.post('/api/test-agent', json={'message': texto})
+            individual = (perf_counter() - inicio) / amostra
+            inicio = perf_counter()
+            resposta = cliente.post('/api/test-agent/batch', json={'messages': corpus, 'config': config})
+            linhas = resposta.get_data().count(b'\n')
+            lote = perf_counter() - inicio
+            verificar_lote_sem_ia(cliente)
+    finally:
+        agente.config_store = store_original
+        shutil.rmtree(diretorio, ignore_errors=True)
+    assert linhas == mensagens, linhas
+    return {
+        'individual_us': individual * 1e6,
+        'lote_por_mensagem_us': lote / mensagens * 1e6,
+        'lote_total_s': lote,
+        'individual_estimado_s': individual * mensagens,
+        'mensagens_por_s': mensagens / lote,
+        'aceleracao_x': individual * mensagens / lote,
+    }
+
+@benchmark
+def bench_carga(conexoes=16, duracao=5.0):
+    # Teste de carga: `conexoes` clientes keep-alive alternando POST
+    # /api/test-agent e GET /api/status por `duracao` segundos. Sem
+    # AGENT_BENCH_URL sobe o servidor com threads do serve_agente neste processo.
+    url = os.getenv('AGENT_BENCH_URL')
+    servidor = None
+    if not url:
+        import logging
+        from werkzeug.serving import make_server
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        servidor = make_server('127.0.0.1', 0, agente.app, threaded=True)
+        servidor.request_queue_size = 128
+        threading.Thread(target=servidor.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{servidor.server_port}'
+    partes = urlsplit(url)
+    corpo_teste = json.dumps({'message': 'qual o cardápio?'}).encode('utf-8')
+    rotas = (
+        ('test_agent', 'POST', '/api/test-agent', corpo_teste, {'Content-Type': 'application/json'}),
+        ('status', 'GET', '/api/status', None, {}),
+    )
+    latencias = {nome: [] for nome, *_ in rotas}
+    erros = [0]
+    fim = perf_counter() + duracao
+
+    def cliente(i):
+        conexao = http.client.HTTPConnection(partes.hostname, partes.port, timeout=10)
+        n = i
+        while perf_counter() < fim:
+            nome, metodo, caminho, corpo, headers = rotas[n % len(rotas)]
+            n += 1
+            t0 = perf_counter()
+            try:
+                conexao.request(metodo, caminho, body=corpo, headers=headers)
+                resposta = conexao.getresponse()
+                resposta.read()
+                if resposta.status != 200:
+                    erros[0] += 1
+            except (OSError, http.client.HTTPException):
+                erros[0] += 1
+                conexao.close()
+                conexao = http.client.HTTPConnection(partes.hostname, partes.port, timeout=10)
+                continue
+            latencias[nome].append(perf_counter() - t0)
+        conexao.close()
+
+    threads = [threading.Thread(target=cliente, args=(i,)) for i in range(conexoes)]
+    t0 = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = perf_counter() - t0
+    if servidor is not None:
+        servidor.shutdown()
+    resultado = {'conexoes': conexoes, 'erros': erros[0]}
+    for nome, amostras in latencias.items():
+        resultado[f'{nome}_rps'] = len(amostras) / total
+        resultado[f'{nome}_p50_ms'] = percentil(amostras, 50) * 1e3
+        resultado[f'{nome}_p99_ms'] = percentil(amostras, 99) * 1e3
+    return resultado
+
+def verificar_historico_entre_processos(diretorio, processos=8, gravacoes=50):
+    # Vários workers gravando o mesmo arquivo: o histórico não repete versão e
+    # a última linha é o que ficou no arquivo
+    caminho = os.path.join(diretorio, 'processos.json')
+
+    def gravar(i):
+        codigo = 1
+        try:
+            backend = agente.JsonFileBackend(caminho)
+            for n in range(gravacoes):
+                backend.write(config_exemplo(f'Pizzaria {i}-{n}'))
+            codigo = 0
+        finally:
+            os._exit(codigo)
+    filhos = []
+    for i in range(processos):
+        pid = os.fork()
+        if pid == 0:
+            gravar(i)
+        filhos.append(pid)
+    for pid in filhos:
+        assert os.waitpid(pid, 0)[1] == 0
+    backend = agente.JsonFileBackend(caminho)
+    entradas = backend.history(processos * gravacoes + 1)
+    assert [v for v, _, _ in entradas] == list(range(processos * gravacoes, 0, -1)), [v for v, _, _ in entradas]
+    assert entradas[0][2] == backend.load()[0]
+
+@benchmark
+def bench_config_concorrente(leitores=8, escritores=4, duracao=2.0):
+    # Saves e loads ao mesmo tempo: mede latência de leitura durante gravações,
+    # quantos saves viraram gravações físicas e se algum leitor viu o padrão
+    diretorio = tempfile.mkdtemp(prefix='bench_agente_')
+    try:
+        if hasattr(os, 'fork'):
+            verificar_historico_entre_processos(diretorio)
+        store = agente.ConfigStore(os.path.join(diretorio, 'agent_config.json'), intervalo_verificacao=0)
+        store.save(config_exemplo('Pizzaria 0'))
+        fim = perf_counter() + duracao
+        latencias = [[] for _ in range(leitores)]
+        viram_padrao = [0] * leitores
+        saves_ok = [0] * escritores
+
+        def ler(i):
+            nome_padrao = agente.DEFAULT_CONFIG['restaurante']['nome']
+            while perf_counter() < fim:
+                t0 = perf_counter()
+                config = store.get()
+                latencias[i].append(perf_counter() - t0)
+                if config['restaurante']['nome'] == nome_padrao:
+                    viram_padrao[i] += 1
+
+        def escrever(i):
+            n = 0
+            while perf_counter() < fim:
+                n += 1
+                if store.save(config_exemplo(f'Pizzaria {i}-{n}')):
+                    saves_ok[i] += 1
+
+        threads = [threading.Thread(target=ler, args=(i,)) for i in range(leitores)]
+        threads += [threading.Thread(target=escrever, args=(i,)) for i in range(escritores)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        todas = [x for lista in latencias for x in lista]
+        stats = store.stats()
+        return {
+            'loads': len(todas),
+            'loads_por_s': len(todas) / duracao,
+            'load_p50_us': percentil(todas, 50) * 1e6,
+            'load_p99_us': percentil(todas, 99) * 1e6,
+            'saves': sum(saves_ok),
+            'gravacoes_fisicas': stats['writes'],
+            'erros_leituras_com_padrao': sum(viram_padrao),
+        }
+    finally:
+        shutil.rmtree(diretorio, ignore_errors=True)
+
+@benchmark
+def bench_config_sql(tamanho=2, leituras=2000):
+    # Configs no SQLite (o mesmo código do Postgres): ida e volta, uma linha
+    # por versão, aviso config_changed entre stores e o pool de conexões
+    diretorio = tempfile.mkdtemp(prefix='bench_config_sql_')
+    registro = agente.tenants
+    try:
+        banco = agente.SqliteConfigDatabase(os.path.join(diretorio, 'configs.db'), tamanho=tamanho)
+        escritor = agente.ConfigStore(agente.SqlConfigBackend(banco, 'loja1'), janela_gravacao=0)
+        t0 = perf_counter()
+        for i in range(3):
+            assert escritor.save(config_exemplo(f'Pizzaria SQL {i}'))
+        salvar = (perf_counter() - t0) / 3
+
+        # Outro store (outro worker) lê o mesmo conteúdo; só verifica a cada hora
+        leitor = agente.ConfigStore(agente.SqlConfigBackend(banco, 'loja1'), intervalo_verificacao=3600)
+        assert agente.thaw_config(leitor.get()) == agente.thaw_config(escritor.get())
+        assert leitor.get()['restaurante']['nome'] == 'Pizzaria SQL 2'
+        assert banco.load('outra') == (None, None)
+
+        assert [v for v, _, _ in banco.history('loja1', 10)] == [3, 2, 1]
+        assert banco.version('loja1', 1)['restaurante']['nome'] == 'Pizzaria SQL 0'
+        historico = escritor.history()
+        assert [h['version'] for h in historico] == [3, 2, 1] and historico[-1]['changes'] is None
+        assert escritor.rollback(1) and banco.latest_version('loja1') == 4
+        assert escritor.get()['restaurante']['nome'] == 'Pizzaria SQL 0'
+
+        # O leitor ainda serve a versão 3 até receber o aviso
+        agente.tenants = agente.TenantRegistry(diretorio)
+        agente.tenants._stores['loja1'] = leitor
+        assert leitor.get()['restaurante']['nome'] == 'Pizzaria SQL 2'
+        recargas = leitor.stats()['reloads']
+        agente.config_changed('loja1')
+        assert leitor.stats()['reloads'] == recargas + 1, leitor.stats()
+        assert leitor.get()['restaurante']['nome'] == 'Pizzaria SQL 0'
+
+        verificando = agente.ConfigStore(agente.SqlConfigBackend(banco, 'loja1'), intervalo_verificacao=0)
+        verificando.get()
+        conferir = por_chamada_us(verificando.get, numero=leituras)
+
+        # Pool: conexões reaproveitadas; com todas em uso, o próximo espera
+        assert banco.pool.connections <= tamanho, banco.pool.stats()
+        ocupadas = contextlib.ExitStack()
+        with ocupadas:
+            for _ in range(tamanho):
+                ocupadas.enter_context(banco.pool.connection())
+            abertas = banco.pool.connections
+            versoes = []
+            esperando = threading.Thread(target=lambda: versoes.append(banco.latest_version('loja1')))
+            esperando.start()
+            esperando.join(0.2)
+            assert esperando.is_alive() and not versoes
+        esperando.join(5)
+        assert versoes == [4], versoes
+        assert banco.pool.connections == abertas <= tamanho, banco.pool.stats()
+        assert banco.pool.stats()['idle'] == tamanho, banco.pool.stats()
+    finally:
+        agente.tenants = registro
+        shutil.rmtree(diretorio, ignore_errors=True)
+    return {
+        'save_ms': salvar * 1e3,
+        'get_com_verificacao_us': conferir,
+        'conexoes_abertas': banco.pool.connections,
+    }
+
+def corretude(metrica, valor):
+    # Métricas de resposta certa (bool, acerto em _pct, contagem erros_): não
+    # têm tolerância nem ruído, qualquer piora em relação à baseline reprova
+    return isinstance(valor, bool) or metrica.endswith('_pct') or metrica.startswith('erros_')
+
+def direcao(metrica, valor=None):
+    # 1: maior é melhor; -1: menor é melhor; 0: informativa (não entra na comparação)
+    if isinstance(valor, bool) or metrica.endswith(('_rps', '_por_s', '_x', '_pct')):
+        return 1
+    if (metrica.endswith(('_us', '_ms', '_s', '_kb', '_mb')) or metrica.startswith('bytes_')
+            or metrica.startswith('erros_')):
+        return -1
+    return 0
+
+def calibracao_us():
+    # Carga fixa de Python puro (dict, str, laço). A razão entre a calibração de
+    # agora e a da baseline desconta máquina mais lenta ou CPU disputada.
+    palavras = [f'palavra{i}' for i in range(200)]
+
+    def carga():
+        contagem = {}
+        for p in palavras:
+            contagem[p.upper()] = contagem.get(p, 0) + len(p)
+        return contagem
+
+    return por_chamada_us(carga, repeticoes=7, numero=500)
+
+def comparar(resultados, baseline, tolerancia, calibracao=None):
+    # Lista de (benchmark, métrica, antes, agora) que pioraram além da tolerância.
+    # Métricas de tempo da baseline são escaladas pela razão das calibrações.
+    regressoes = []
+    escala = 1.0
+    if calibracao and baseline.get('calibration_us'):
+        escala = calibracao / baseline['calibration_us']
+    for nome, metricas in resultados.items():
+        antes = baseline.get('results', {}).get(nome, {})
+        for metrica, valor in metricas.items():
+            referencia = antes.get(metrica)
+            sentido = direcao(metrica, valor)
+            if not sentido or not isinstance(referencia, (int, float)):
+                continue
+            if corretude(metrica, valor):
+                if sentido * (valor - referencia) < 0:
+                    regressoes.append((nome, metrica, referencia, valor))
+                continue
+            if not referencia:
+                continue
+            if metrica.endswith(('_us', '_ms', '_s')) and not metrica.endswith('_por_s'):
+                referencia *= escala
+            elif sentido == 1 and metrica.endswith(('_rps', '_por_s')):
+                referencia /= escala
+            variacao = (valor - referencia) / referencia
+            if -sentido * variacao > tolerancia:
+                regressoes.append((nome, metrica, referencia, valor))
+    return regressoes
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmarks do Agente IA')
+    parser.add_argument('nomes', nargs='*', help=f"benchmarks a rodar (padrão: todos): {', '.join(BENCHMARKS)}")
+    parser.add_argument('--save', metavar='ARQUIVO', help='grava os resultados como baseline JSON')
+    parser.add_argument('--compare', metavar='ARQUIVO', help='compara com uma baseline JSON')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='piora relativa aceita (padrão: 0.25)')
+    args = parser.parse_args(argv)
+    nomes = args.nomes or list(BENCHMARKS)
+    for nome in nomes:
+        if nome not in BENCHMARKS:
+            print(f"Benchmark desconhecido: {nome} (disponíveis: {', '.join(BENCHMARKS)})")
+            return 2
+    resultados = {}
+    calibracao = calibracao_us() if args.save or args.compare else None
+    for nome in nomes:
+        resultado = resultados[nome] = BENCHMARKS[nome]()
+        print(f"== {nome}")
+        for chave, valor in resultado.items():
+            print(f"   {chave:<28} {valor:,.2f}" if isinstance(valor, float) else f"   {chave:<28} {valor}")
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'machine': platform.machine(),
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'calibration_us': calibracao,
+                'results': resultados,
+            }, f, indent=2, ensure_ascii=False)
+        print(f"Baseline gravada em {args.save}")
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        calibracao = calibracao_us()
+        regressoes = comparar(resultados, baseline, args.tolerance, calibracao)
+        for _ in range(2):
+            # Confirma: roda de novo os benchmarks suspeitos e fica com o melhor
+            # valor de cada métrica, para ruído passageiro não reprovar a rodada
+            if not regressoes:
+                break
+            for nome in {r[0] for r in regressoes}:
+                for metrica, valor in BENCHMARKS[nome]().items():
+                    sentido = direcao(metrica, valor)
+                    if sentido and isinstance(valor, (int, float)) and not corretude(metrica, valor):
+                        anterior = resultados[nome][metrica]
+                        resultados[nome][metrica] = max(anterior, valor) if sentido > 0 else min(anterior, valor)
+            regressoes = comparar(resultados, baseline, args.tolerance, calibracao)
+        for nome, metrica, antes, agora in regressoes:
+            variacao = f" ({(agora - antes) / antes:+.0%})" if antes else ''
+            print(f"REGRESSÃO {nome}.{metrica}: {antes:,.2f} -> {agora:,.2f}{variacao}")
+        if regressoes:
+            return 1
+        print(f"Sem regressões acima de {args.tolerance:.0%} em relação a {args.compare}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
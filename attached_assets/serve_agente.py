@@ -0,0 +1,107 @@
+# serve_agente.py - Servidor de produção do Agente IA (agente_template_final.py)
+#
+# Uso:
+#   python serve_agente.py                             # gunicorn se instalado; senão servidor com threads
+#   gunicorn -c serve_agente.py agente_template_final:app
+#   uvicorn --interface wsgi --workers 4 agente_template_final:app   # sem pré-carga compartilhada
+#
+# Com gunicorn, o master importa o módulo, carrega as configs e compila os
+# motores (preload_app + on_starting) e congela o heap (gc.freeze) antes do
+# fork: os workers compartilham essas páginas por copy-on-write.
+#
+# kill -HUP <pid>: relê as configurações. No gunicorn, o master recarrega e
+# troca os workers aos poucos, sem derrubar requisições em andamento.
+#
+# Variáveis: AGENT_BIND (0.0.0.0:5000), AGENT_WORKERS, AGENT_THREADS,
+# AGENT_SECRET_KEY (recomendado com vários processos), AGENT_CONFIG_URL
+# (sqlite:///... ou postgresql://...: configs compartilhadas entre máquinas),
+# AGENT_WEBHOOK_TOKEN (obrigatório com MEGAAPI_TOKEN: cadastre no megaAPI a URL
+# /webhook/megaapi?token=<segredo>).
+import gc
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+bind = os.getenv('AGENT_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('AGENT_WORKERS', str(min(2 * (os.cpu_count() or 1) + 1, 9))))
+# gthread: o stream de status (SSE) ocupa uma thread por cliente conectado
+worker_class = 'gthread'
+threads = int(os.getenv('AGENT_THREADS', '8'))
+preload_app = True
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+
+def on_starting(server):
+    import agente_template_final as agente
+    server.log.info('Agente IA: %d configurações pré-carregadas', agente.preload())
+
+def on_reload(server):
+    import agente_template_final as agente
+    agente.reload_configs()
+    server.log.info('Agente IA: %d configurações recarregadas', agente.preload())
+
+def pre_fork(server, worker):
+    # Tira do GC tudo o que já existe: a coleta no worker não toca (e não
+    # copia) as páginas herdadas do master
+    gc.freeze()
+
+def worker_exit(server, worker):
+    import agente_template_final as agente
+    agente.shutdown()
+
+def servidor_threads(agente, host, porta):
+    # Sem gunicorn: um processo, uma thread por requisição
+    from werkzeug.serving import make_server
+    servidor = make_server(host, porta, agente.app, threaded=True)
+
+    def recarregar(*args):
+        agente.reload_configs()
+        print(f"Agente IA: {agente.preload()} configurações recarregadas")
+
+    def parar(*args):
+        # shutdown() espera o serve_forever, que roda nesta mesma thread
+        threading.Thread(target=servidor.shutdown).start()
+
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, recarregar)
+    signal.signal(signal.SIGTERM, parar)
+    signal.signal(signal.SIGINT, parar)
+    print(f"🤖 Agente IA em http://{host}:{porta} (servidor com threads, 1 processo)")
+    servidor.serve_forever()
+    agente.shutdown()
+
+def main():
+    import agente_template_final as agente
+    if not os.getenv('AGENT_SECRET_KEY'):
+        print("Aviso: AGENT_SECRET_KEY não definida; usando uma chave aleatória por execução")
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        host, porta = bind.rsplit(':', 1)
+        print(f"Agente IA: {agente.preload()} configurações pré-carregadas")
+        servidor_threads(agente, host, int(porta))
+        return 0
+
+    class Aplicacao(BaseApplication):
+        def load_config(self):
+            opcoes = {
+                'bind': bind, 'workers': workers, 'worker_class': worker_class, 'threads': threads,
+                'preload_app': preload_app, 'timeout': timeout, 'graceful_timeout': graceful_timeout,
+                'keepalive': keepalive, 'on_starting': on_starting, 'on_reload': on_reload,
+                'pre_fork': pre_fork, 'worker_exit': worker_exit,
+            }
+            for nome, valor in opcoes.items():
+                self.cfg.set(nome, valor)
+
+        def load(self):
+            return agente.app
+
+    Aplicacao().run()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())